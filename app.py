@@ -1,8 +1,8 @@
+import re
 from flask import Flask, render_template, request, jsonify
-import pandas as pd
 from movies import (
     recommend, search_titles, get_movies_by_actor,
-    search_actors, search_genres, get_movies_by_genre, get_top_rated_movies, movies_df
+    search_actors, search_genres, get_movies_by_genre, get_top_rated_movies, known_genre_words
 )
 
 app = Flask(__name__)
@@ -35,44 +35,31 @@ def search():
 @app.route("/recommend", methods=["POST"])
 def recommend_movies():
     movie_name = request.form["movie_name"].strip()
-    rec_df = None
+    recs = []
 
-    # Genre search
-    if movie_name.lower().startswith("genre:") or any(g in movie_name.lower() for g in ["action","comedy","horror","drama","thriller"]):
-        genre = movie_name.lower().replace("movies","").replace("genre:","").strip()
-        rec_df = get_movies_by_genre(genre, limit=10)
+    # Genre search: "Genre: X", or a query made only of genre words ("action movies")
+    words = set(re.findall(r"[\w-]+", movie_name.lower()))
+    is_genre = bool(words & known_genre_words) and words <= known_genre_words | {"movie", "movies"}
+    if movie_name.lower().startswith("genre:") or is_genre:
+        genre = movie_name.lower().replace("movies","").replace("movie","").replace("genre:","").strip()
+        recs = get_movies_by_genre(genre, limit=10)
 
     # Top-rated search
     elif movie_name.lower() in ["top 10 rated movies", "top", "best", "high rating"]:
-        rec_df = get_top_rated_movies(limit=10)
+        recs = get_top_rated_movies(limit=10)
 
-    # Movie similarity or partial title search
+    # Movie similarity or partial title search, then actor search
     else:
-        rec_df = recommend(movie_name, top_n=5)
+        recs = recommend(movie_name, top_n=5)
+        if not recs:
+            recs = get_movies_by_actor(movie_name)
 
-        if rec_df.empty:
-            partial_mask = movies_df["title_norm"].str.contains(movie_name.lower())
-            filtered = movies_df[partial_mask].copy()
-            if not filtered.empty:
-                filtered["imdb_rating"] = pd.to_numeric(filtered["imdb_rating"], errors="coerce")
-                filtered = filtered.sort_values(by="imdb_rating", ascending=False).head(5)
-                rec_df = filtered[["title_x", "imdb_rating", "actors", "genres_pretty", "release_date", "story"]]
-                rec_df = rec_df.rename(columns={
-                    "title_x": "title",
-                    "imdb_rating": "rating",
-                    "genres_pretty": "genre"
-                })
-
-        if rec_df.empty:
-            rec_df = get_movies_by_actor(movie_name)
-
-    not_found = rec_df.empty
-    recs_list = rec_df.to_dict(orient="records") if not not_found else []
+    not_found = not recs
 
     return render_template(
         "result.html",
         movie_name=movie_name,
-        recommendations=recs_list,
+        recommendations=recs,
         not_found=not_found
     )
 
@@ -0,0 +1,9 @@
+"""Prebuild the cleaned dataset and TF-IDF index so app startup skips the fit.
+
+Run after changing movies.csv or the index-building code:  python build_index.py
+"""
+import movies
+
+if __name__ == "__main__":
+    n = movies.save_index()
+    print(f"Indexed {n} movies -> {', '.join(movies.ARTIFACT_PATHS)}")
@@ -1,13 +1,49 @@
 import pandas as pd
 import numpy as np
+import bisect
+import os
 import re
+from collections import defaultdict
+from functools import lru_cache
+from itertools import accumulate, islice
+import joblib
+import scipy.sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-# -------------------- Load dataset safely --------------------
-movies_df = pd.read_csv("movies.csv", dtype=str, keep_default_na=False)
+# -------------------- Data & prebuilt index files --------------------
+MOVIES_CSV = "movies.csv"
+MOVIES_PARQUET = "movies.parquet"
+TFIDF_PATH = "tfidf.joblib"
+TFIDF_MATRIX_PATH = "tfidf_matrix.npz"
+ARTIFACT_PATHS = (MOVIES_PARQUET, TFIDF_PATH, TFIDF_MATRIX_PATH)
+# Saved with the vectorizer; bump whenever build_index() output changes so
+# files written by older code are rebuilt instead of loaded
+INDEX_VERSION = 1
+# Pruned vocabulary (terms in 2+ movies, not in 90%+) keeps the matrix small;
+# float32 halves the bytes scanned per query, cosines don't need float64.
+# A saved vectorizer with different settings is rebuilt, not loaded.
+TFIDF_PARAMS = dict(
+    stop_words="english",
+    ngram_range=(1, 2),
+    max_features=20000,
+    min_df=2,
+    max_df=0.9,
+    sublinear_tf=True,
+    # Rows come out L2-normalized, so a plain dot product is the cosine
+    # similarity; it is computed per query instead of an N x N matrix
+    norm="l2",
+    dtype=np.float32,
+)
+# Columns build_index() derives and the lookups below read
+INDEX_COLUMNS = [
+    "title_x", "title_norm", "imdb_rating", "imdb_rating_num", "genres", "genres_pretty",
+    "actors", "actors_list_pretty", "actors_top2", "release_date", "story",
+]
 
 # -------------------- Helper functions --------------------
+_SEP_RE = re.compile(r"[;,/|]+")
+_WS_RE = re.compile(r"\s+")
+
 def nz(s: str) -> str:
     if s is None:
         return ""
@@ -20,92 +56,174 @@ def split_multi(s: str) -> list[str]:
     s = nz(s)
     if not s:
         return []
-    s = re.sub(r"[;,/]+", "|", s)
-    s = re.sub(r"\|{2,}", "|", s)
-    return [p.strip() for p in s.split("|") if p.strip()]
-
-def top2_actors_from_string(s: str) -> list[str]:
-    tokens = split_multi(s)
-    top2 = tokens[:2]
-    return [t.strip().title() for t in top2]
+    return [p.strip() for p in _SEP_RE.split(s) if p.strip()]
 
 def normalize_title(t: str) -> str:
     t = nz(t).lower()
-    t = re.sub(r"\s+", " ", t)
+    t = _WS_RE.sub(" ", t)
     return t.strip()
 
 def pretty_genres(g: str) -> str:
     g = nz(g)
     if not g:
         return ""
-    g2 = re.sub(r"[;,/]+", "|", g)
-    g2 = re.sub(r"\|{2,}", "|", g2)
-    parts = [p.strip() for p in g2.split("|") if p.strip()]
+    parts = [p.strip() for p in _SEP_RE.split(g) if p.strip()]
     return " | ".join(parts)
 
-# -------------------- Minimal column sanity --------------------
-for col in ["title_x", "imdb_rating", "genres", "actors", "story", "release_date"]:
-    if col not in movies_df.columns:
-        movies_df[col] = ""
+# Column-wise versions of nz / pretty_genres for the load-time cleaning passes
+def nz_series(s: pd.Series) -> pd.Series:
+    s = s.fillna("").astype("string[pyarrow]").str.strip()
+    return s.mask(s.str.lower().isin({"nan", "none", "null"}), "")
 
-movies_df["title_x"] = movies_df["title_x"].apply(nz)
-movies_df = movies_df[movies_df["title_x"] != ""].copy()
-movies_df = movies_df.drop_duplicates(subset=["title_x"]).reset_index(drop=True)
+# Everything str.strip() treats as whitespace, spelled out because pyarrow's
+# regex engine only matches ASCII whitespace with \s
+_WS_CHARS = "\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
 
-# -------------------- Clean & feature engineering --------------------
-movies_df["story"] = movies_df["story"].apply(nz)
-movies_df["genres"] = movies_df["genres"].apply(nz)
-movies_df["release_date"] = movies_df["release_date"].apply(nz)
-movies_df["actors"] = movies_df["actors"].apply(nz)
+def pretty_genres_series(g: pd.Series) -> pd.Series:
+    g = nz_series(g)
+    g = g.str.replace(f"[{_WS_CHARS}]*[;,/|][{_WS_CHARS};,/|]*", " | ", regex=True)
+    return g.str.replace(f"^[{_WS_CHARS}|]+|[{_WS_CHARS}|]+$", "", regex=True)
 
-movies_df["actors_top2"] = movies_df["actors"].apply(top2_actors_from_string)
-movies_df["genres_pretty"] = movies_df["genres"].apply(pretty_genres)
+# -------------------- Build / load index --------------------
+def build_index():
+    """Clean movies.csv and fit the TF-IDF model from scratch."""
+    # pyarrow parses in parallel and gives Arrow-backed string columns
+    movies_df = pd.read_csv(MOVIES_CSV, engine="pyarrow", dtype="string[pyarrow]", keep_default_na=False)
 
-movies_df["combined_text"] = (
-    movies_df["story"] + " " + movies_df["genres"] + " " + movies_df["actors"]
-)
-movies_df["combined_text"] = movies_df["combined_text"].apply(nz)
-movies_df = movies_df[movies_df["combined_text"] != ""].reset_index(drop=True)
+    # Minimal column sanity
+    for col in ["title_x", "imdb_rating", "genres", "actors", "story", "release_date"]:
+        if col not in movies_df.columns:
+            movies_df[col] = ""
+
+    movies_df["title_x"] = nz_series(movies_df["title_x"])
+    movies_df = movies_df[movies_df["title_x"] != ""].copy()
+    movies_df = movies_df.drop_duplicates(subset=["title_x"]).reset_index(drop=True)
+
+    # Clean & feature engineering
+    text_cols = ["imdb_rating", "story", "genres", "release_date", "actors"]
+    movies_df[text_cols] = movies_df[text_cols].apply(nz_series)
+
+    # Inputs are already cleaned, so one C-level concat is enough
+    movies_df["combined_text"] = movies_df["story"].str.cat([movies_df["genres"], movies_df["actors"]], sep=" ")
+    has_text = (movies_df[["story", "genres", "actors"]] != "").any(axis=1)
+    movies_df = movies_df[has_text].reset_index(drop=True)
 
-# -------------------- Vectorize & Similarity --------------------
-tfidf = TfidfVectorizer(stop_words="english")
-tfidf_matrix = tfidf.fit_transform(movies_df["combined_text"])
-cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+    movies_df["imdb_rating_num"] = pd.to_numeric(movies_df["imdb_rating"], errors="coerce").astype("float64")
+    movies_df["genres_pretty"] = pretty_genres_series(movies_df["genres"])
+
+    # The per-row Python work, fused into a single pass over the rows
+    title_norm, actors_pretty, actors_top2 = [], [], []
+    for title, actors in zip(movies_df["title_x"].to_numpy(), movies_df["actors"].to_numpy()):
+        title_norm.append(normalize_title(title))
+        pretty = [a.title() for a in split_multi(actors)]
+        actors_pretty.append(pretty)
+        actors_top2.append(pretty[:2])
+    movies_df["title_norm"] = pd.Series(title_norm, index=movies_df.index, dtype=object)
+    movies_df["actors_list_pretty"] = pd.Series(actors_pretty, index=movies_df.index, dtype=object)
+    movies_df["actors_top2"] = pd.Series(actors_top2, index=movies_df.index, dtype=object)
+
+    # Vectorize & Similarity
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+    tfidf_matrix = tfidf.fit_transform(movies_df["combined_text"])
+    return movies_df, tfidf, tfidf_matrix
+
+def save_index() -> int:
+    """Rebuild the index from movies.csv and write it for fast startup."""
+    movies_df, tfidf, tfidf_matrix = build_index()
+    movies_df.to_parquet(MOVIES_PARQUET, index=False)
+    joblib.dump({"version": INDEX_VERSION, "tfidf": tfidf}, TFIDF_PATH, compress=3)
+    scipy.sparse.save_npz(TFIDF_MATRIX_PATH, tfidf_matrix)
+    return len(movies_df)
+
+def _index_is_fresh() -> bool:
+    if not all(os.path.exists(p) for p in ARTIFACT_PATHS):
+        return False
+    csv_mtime = os.path.getmtime(MOVIES_CSV)
+    return all(os.path.getmtime(p) >= csv_mtime for p in ARTIFACT_PATHS)
+
+def load_index():
+    """Load the prebuilt index if it is current, else build it from movies.csv."""
+    if not _index_is_fresh():
+        return build_index()
+    saved = joblib.load(TFIDF_PATH)
+    if not isinstance(saved, dict) or saved.get("version") != INDEX_VERSION:
+        return build_index()
+    tfidf = saved["tfidf"]
+    params = tfidf.get_params()
+    if any(params.get(k) != v for k, v in TFIDF_PARAMS.items()):
+        return build_index()
+    with pd.option_context("mode.string_storage", "pyarrow"):
+        movies_df = pd.read_parquet(MOVIES_PARQUET, engine="pyarrow")
+    if not set(INDEX_COLUMNS) <= set(movies_df.columns):
+        return build_index()
+    # Parquet hands list columns back as numpy arrays
+    for col in ["actors_top2", "actors_list_pretty"]:
+        movies_df[col] = movies_df[col].map(list)
+    tfidf_matrix = scipy.sparse.load_npz(TFIDF_MATRIX_PATH)
+    return movies_df, tfidf, tfidf_matrix
+
+movies_df, tfidf, tfidf_matrix = load_index()
 
 # Index maps
-movies_df["title_norm"] = movies_df["title_x"].apply(normalize_title)
 idx_by_title = pd.Series(movies_df.index, index=movies_df["title_norm"]).drop_duplicates()
 all_norm_titles = movies_df["title_norm"].tolist()
+title_norm_arr = movies_df["title_norm"].to_numpy()
+title_arr = movies_df["title_x"].to_numpy()
 
-# Flatten all actors for autocomplete
-all_actors_set = set()
-for s in movies_df["actors"]:
-    for a in split_multi(s):
-        all_actors_set.add(a.lower())
-all_actors_list = sorted(list(all_actors_set))
-
-# Genre list for autocomplete
+# Flatten all actors (with an inverted index actor -> rows) and genres for
+# autocomplete, in one pass over the rows
+actor_to_rows: dict[str, list[int]] = defaultdict(list)
 all_genres_set = set()
-for g in movies_df["genres"]:
-    for gg in split_multi(g):
-        all_genres_set.add(gg.lower())
+for row_idx, (actors, genres) in enumerate(zip(movies_df["actors"], movies_df["genres"])):
+    for a in split_multi(actors):
+        rows = actor_to_rows[a.lower()]
+        if not rows or rows[-1] != row_idx:
+            rows.append(row_idx)
+    for g in split_multi(genres):
+        all_genres_set.add(g.lower())
+all_actors_list = sorted(actor_to_rows)
+# All names in one string, so a substring search is a few str.find calls
+actors_blob = "\0".join(all_actors_list)
+actor_starts = [0, *accumulate(len(a) + 1 for a in all_actors_list)]
+
 all_genres_list = sorted(list(all_genres_set))
+# Words that make up genre names, to tell genre searches apart from titles
+known_genre_words = frozenset(w for g in all_genres_list for w in re.findall(r"[\w-]+", g))
 
 # -------------------- Public API --------------------
 def search_titles(query: str, limit: int = 10) -> list[str]:
     q = normalize_title(query)
     if not q:
         return []
-    mask = movies_df["title_norm"].str.contains(q, na=False)
-    hits = movies_df.loc[mask, "title_x"].head(limit).tolist()
-    return hits
+    return list(_search_titles_cached(q, limit))
+
+@lru_cache(maxsize=4096)
+def _search_titles_cached(q: str, limit: int) -> tuple[str, ...]:
+    # Plain substring scan that stops as soon as `limit` titles are found
+    hits = (title for t, title in zip(title_norm_arr, title_arr) if q in t)
+    return tuple(islice(hits, limit))
 
 def search_actors(query: str, limit: int = 10) -> list[str]:
     q = query.lower().strip()
     if not q:
         return []
-    matches = [a.title() for a in all_actors_list if q in a]
-    return matches[:limit]
+    return list(_search_actors_cached(q, limit))
+
+@lru_cache(maxsize=4096)
+def _search_actors_cached(q: str, limit: int) -> tuple[str, ...]:
+    # Prefix matches come first: a contiguous slice of the sorted list
+    lo = bisect.bisect_left(all_actors_list, q)
+    hi = bisect.bisect_left(all_actors_list, q + "\uffff")
+    matches = all_actors_list[lo:min(hi, lo + limit)]
+    if len(matches) < limit and "\0" not in q:
+        # Fill up with names containing q elsewhere
+        pos = actors_blob.find(q)
+        while pos != -1 and len(matches) < limit:
+            i = bisect.bisect_right(actor_starts, pos) - 1
+            if not lo <= i < hi:
+                matches.append(all_actors_list[i])
+            pos = actors_blob.find(q, actor_starts[i + 1])
+    return tuple(a.title() for a in matches)
 
 def search_genres(query: str, limit: int = 10) -> list[str]:
     q = query.lower().strip()
@@ -120,90 +238,62 @@ def _best_match_index(movie_name: str):
         return int(idx_by_title[q])
     return None
 
-def recommend(movie_name: str, top_n: int = 5) -> pd.DataFrame:
-    idx = _best_match_index(movie_name)
+def _nearest_neighbors(idx: int, top_n: int) -> list[int]:
+    """Exact top_n cosine neighbours of row idx (itself excluded), best first."""
+    # Brute force over the sparse matrix: one matvec, no N x N matrix.
+    # This is the place to plug in an ANN index if the catalogue grows.
+    # CSR times the query's dense row: a contiguous float32 array, no sparse result
+    row = tfidf_matrix @ tfidf_matrix[idx].toarray().ravel()
+    row[idx] = -np.inf
+    k = min(top_n, len(row) - 1)
+    if k <= 0:
+        return []
+    # O(N) partition for the top k, then sort only those
+    top = np.argpartition(row, -k)[-k:]
+    return top[np.argsort(-row[top])].tolist()
+
+def _to_records(rows: pd.DataFrame) -> list[dict]:
+    """Result cards (as rendered by result.html) for the given movies_df rows."""
+    return [
+        {"title": t, "rating": r, "actors": a, "genre": g, "release_date": d, "story": s}
+        for t, r, a, g, d, s in zip(
+            rows["title_x"].to_numpy(), rows["imdb_rating"].to_numpy(),
+            rows["actors_list_pretty"].to_numpy(), rows["genres_pretty"].to_numpy(),
+            rows["release_date"].to_numpy(), rows["story"].to_numpy(),
+        )
+    ]
+
+def recommend(movie_name: str, top_n: int = 5) -> list[dict]:
+    return list(_recommend_cached(normalize_title(movie_name), top_n))
+
+# Results only depend on the (static) movies_df, so repeat queries are cached.
+# Records are returned as a tuple of dicts; callers must not mutate them.
+@lru_cache(maxsize=4096)
+def _recommend_cached(movie_norm: str, top_n: int) -> tuple[dict, ...]:
+    idx = _best_match_index(movie_norm)
     if idx is None:
         # Partial match
-        partial_mask = movies_df["title_norm"].str.contains(normalize_title(movie_name))
-        filtered = movies_df[partial_mask].copy()
-        if filtered.empty:
-            return pd.DataFrame()
-        filtered["imdb_rating"] = pd.to_numeric(filtered["imdb_rating"], errors="coerce")
-        filtered = filtered.sort_values(by="imdb_rating", ascending=False).head(top_n)
-        out = pd.DataFrame({
-            "title": filtered["title_x"].values,
-            "rating": filtered["imdb_rating"].fillna("").values,
-            "actors": filtered["actors"].apply(lambda s: [a.strip().title() for a in split_multi(s)]).values,
-            "genre": filtered["genres_pretty"].values,
-            "release_date": filtered["release_date"].values,
-            "story": filtered["story"].fillna("").values
-        })
-        return out
-
-    sims = list(enumerate(cosine_sim[idx]))
-    sims = sorted(sims, key=lambda x: x[1], reverse=True)
-    picked = []
-    for i, _ in sims:
-        if i == idx:
-            continue
-        picked.append(i)
-        if len(picked) >= top_n:
-            break
-    recs = movies_df.iloc[picked].copy()
-    out = pd.DataFrame({
-        "title": recs["title_x"].values,
-        "rating": recs["imdb_rating"].fillna("").values,
-        "actors": recs["actors"].apply(lambda s: [a.strip().title() for a in split_multi(s)]).values,
-        "genre": recs["genres_pretty"].values,
-        "release_date": recs["release_date"].values,
-        "story": recs["story"].fillna("").values
-    })
-    return out
-
-def get_movies_by_actor(actor_name: str) -> pd.DataFrame:
+        partial_mask = movies_df["title_norm"].str.contains(movie_norm, regex=False, na=False)
+        filtered = movies_df[partial_mask]
+        filtered = filtered.sort_values(by="imdb_rating_num", ascending=False).head(top_n)
+        return tuple(_to_records(filtered))
+
+    picked = _nearest_neighbors(idx, top_n)
+    return tuple(_to_records(movies_df.iloc[picked]))
+
+def get_movies_by_actor(actor_name: str) -> list[dict]:
     actor_name = actor_name.lower().strip()
-    mask = movies_df["actors"].apply(lambda s: any(actor_name in a.lower() for a in split_multi(s)))
-    filtered = movies_df[mask]
-    if filtered.empty:
-        return pd.DataFrame()
-    out = pd.DataFrame({
-        "title": filtered["title_x"].values,
-        "rating": filtered["imdb_rating"].fillna("").values,
-        "actors": filtered["actors"].apply(lambda s: [a.strip().title() for a in split_multi(s)]).values,
-        "genre": filtered["genres_pretty"].values,
-        "release_date": filtered["release_date"].values,
-        "story": filtered["story"].fillna("").values
-    })
-    return out
-
-def get_movies_by_genre(genre: str, limit: int = 10) -> pd.DataFrame:
+    # Substring match over the distinct actor names, not every movie row
+    rows = set().union(*(actor_to_rows[a] for a in all_actors_list if actor_name in a))
+    return _to_records(movies_df.iloc[sorted(rows)])
+
+def get_movies_by_genre(genre: str, limit: int = 10) -> list[dict]:
     genre = genre.lower().strip()
     mask = movies_df["genres"].apply(lambda s: genre in s.lower())
-    filtered = movies_df[mask].copy()
-    if filtered.empty:
-        return pd.DataFrame()
-    filtered["imdb_rating"] = pd.to_numeric(filtered["imdb_rating"], errors="coerce")
-    filtered = filtered.sort_values(by="imdb_rating", ascending=False).head(limit)
-    out = pd.DataFrame({
-        "title": filtered["title_x"].values,
-        "rating": filtered["imdb_rating"].fillna("").values,
-        "actors": filtered["actors"].apply(lambda s: [a.strip().title() for a in split_multi(s)]).values,
-        "genre": filtered["genres_pretty"].values,
-        "release_date": filtered["release_date"].values,
-        "story": filtered["story"].fillna("").values
-    })
-    return out
-
-def get_top_rated_movies(limit: int = 10) -> pd.DataFrame:
-    df = movies_df.copy()
-    df["imdb_rating"] = pd.to_numeric(df["imdb_rating"], errors="coerce")
-    df = df.sort_values(by="imdb_rating", ascending=False).head(limit)
-    out = pd.DataFrame({
-        "title": df["title_x"].values,
-        "rating": df["imdb_rating"].fillna("").values,
-        "actors": df["actors"].apply(lambda s: [a.strip().title() for a in split_multi(s)]).values,
-        "genre": df["genres_pretty"].values,
-        "release_date": df["release_date"].values,
-        "story": df["story"].fillna("").values
-    })
-    return out
+    filtered = movies_df[mask]
+    filtered = filtered.sort_values(by="imdb_rating_num", ascending=False).head(limit)
+    return _to_records(filtered)
+
+def get_top_rated_movies(limit: int = 10) -> list[dict]:
+    df = movies_df.sort_values(by="imdb_rating_num", ascending=False).head(limit)
+    return _to_records(df)